@@ -1,55 +1,51 @@
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-import torch
 import logging
 
+from core.t5_service import T5Service
+
 class ContentRefiner:
     """
     Uses the T5 model to intelligently elaborate on text, creating a
     detailed, readable paragraph based on the user's query.
     """
-    MODEL_NAME = 't5-small'
-
     def __init__(self):
         """
-        Initializes the tokenizer and model.
+        Attaches to the shared T5 service; the model is loaded on first use.
         """
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logging.info(f"ContentRefiner using device: {self.device}")
-        try:
-            self.tokenizer = T5Tokenizer.from_pretrained(self.MODEL_NAME, legacy=False)
-            self.model = T5ForConditionalGeneration.from_pretrained(self.MODEL_NAME).to(self.device)
-            logging.info(f"ContentRefiner model '{self.MODEL_NAME}' loaded successfully.")
-        except Exception as e:
-            logging.error(f"Failed to load T5 model or tokenizer: {self.MODEL_NAME}")
-            raise e
+        self.service = T5Service.get()
+        logging.info(f"ContentRefiner using shared T5 model '{self.service.MODEL_NAME}'.")
 
-    def refine_text(self, query: str, text: str) -> str:
+    def refine_text(self, query: str, text: str, num_beams: int = 1) -> str:
         """
         Generates a detailed, query-focused paragraph from the source text.
         """
-        if not text:
-            return ""
+        return self.refine_batch([query], [text], num_beams=num_beams)[0]
 
-        prompt = (
-            f"Based on the user's request for '{query}', extract the most relevant information from the following text. "
-            f"Combine the key points into a comprehensive and detailed paragraph of 120-150 words. Do not just list facts, "
-            f"but explain them in a readable and informative way. Text: {text}"
-        )
-        
-        inputs = self.tokenizer.encode(
-            prompt,
-            return_tensors='pt',
-            max_length=1024,
-            truncation=True
-        ).to(self.device)
+    def refine_batch(self, queries: list, texts: list, num_beams: int = 1, batch_size: int = 16) -> list:
+        """
+        Generates query-focused paragraphs for many texts at once.
+
+        Args:
+            queries (list of str): The user's request for each text.
+            texts (list of str): The source texts to refine.
+            num_beams (int): Beam width; 1 decodes greedily, 2 when quality matters.
+            batch_size (int): Number of prompts decoded together.
 
-        refined_text_ids = self.model.generate(
-            inputs,
+        Returns:
+            list of str: The refined paragraph for each input text.
+        """
+        prompts = [
+            (
+                f"Based on the user's request for '{query}', extract the most relevant information from the following text. "
+                f"Combine the key points into a comprehensive and detailed paragraph of 120-150 words. Do not just list facts, "
+                f"but explain them in a readable and informative way. Text: {text}"
+            ) if text else ""
+            for query, text in zip(queries, texts)
+        ]
+        return self.service.generate(
+            prompts,
             max_length=350,
             min_length=120,
             length_penalty=2.0,
-            num_beams=4,
-            early_stopping=True
+            num_beams=num_beams,
+            batch_size=batch_size
         )
-        refined_text = self.tokenizer.decode(refined_text_ids[0], skip_special_tokens=True)
-        return refined_text
@@ -1,9 +1,12 @@
 import fitz  # PyMuPDF
 import os
 import logging
-from collections import Counter
 import re
 
+# Default "dict" extraction flags minus TEXT_PRESERVE_IMAGES: image blocks are never
+# used for header detection, and decoding them is the costliest part of "dict" mode.
+TEXT_ONLY_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
 class PDFProcessor:
     """
     Handles the extraction of structured sections (title + content) from PDF files
@@ -21,7 +24,8 @@ class PDFProcessor:
             pdf_path (str): The full path to the PDF file.
 
         Returns:
-            list: A list of section dictionaries, each with a 'title' and 'content'.
+            list: A list of section dictionaries, each with a 'title' and 'content',
+                  plus lowercased 'content_lower' and 'document_lower' copies.
         """
         doc_name = os.path.basename(pdf_path)
         try:
@@ -30,20 +34,28 @@ class PDFProcessor:
             logging.error(f"Failed to open {doc_name}: {e}")
             return []
 
+        # Lowercased copies are stored on each section so later stages don't recompute them
+        doc_name_lower = doc_name.lower()
         sections = []
         # Process page by page to maintain context
         for page_num, page in enumerate(doc, start=1):
-            blocks = page.get_text("dict").get("blocks", [])
+            blocks = page.get_text("dict", flags=TEXT_ONLY_FLAGS).get("blocks", [])
             if not blocks:
                 continue
 
             # 1. Identify the most common font size to determine body text style
-            font_sizes = [s['size'] for b in blocks if b['type'] == 0 for l in b['lines'] for s in l['spans']]
-            if not font_sizes:
+            size_counts = {}
+            for b in blocks:
+                if b['type'] != 0: continue
+                for l in b['lines']:
+                    for s in l['spans']:
+                        size = round(s['size'], 2)
+                        size_counts[size] = size_counts.get(size, 0) + 1
+            if not size_counts:
                 continue
-            
-            size_counts = Counter(round(s, 2) for s in font_sizes)
-            body_size = size_counts.most_common(1)[0][0] if size_counts else 12.0
+
+            body_size = max(size_counts.items(), key=lambda kv: kv[1])[0]
+            header_min_size = body_size * 1.1
 
             # 2. Iterate through blocks to group content under headers
             current_header = f"Content from Page {page_num}" # Default title
@@ -58,7 +70,7 @@ class PDFProcessor:
 
                 # A more robust header detection heuristic
                 is_header = (
-                    round(first_span['size'], 2) > body_size * 1.1 and
+                    round(first_span['size'], 2) > header_min_size and
                     ('bold' in first_span['font'].lower() or 'black' in first_span['font'].lower()) and
                     len(text.split()) < 12 and
                     len(text) > 3 and
@@ -73,9 +85,11 @@ class PDFProcessor:
                         if len(full_content.split()) > 10: # Only save substantial sections
                             sections.append({
                                 'document': doc_name,
+                                'document_lower': doc_name_lower,
                                 'page_num': page_num,
                                 'title': current_header,
-                                'content': full_content
+                                'content': full_content,
+                                'content_lower': full_content.lower()
                             })
                     
                     # Start a new section with the detected header
@@ -100,11 +114,27 @@ class PDFProcessor:
                 if len(full_content.split()) > 10:
                     sections.append({
                         'document': doc_name,
+                        'document_lower': doc_name_lower,
                         'page_num': page_num,
                         'title': current_header,
-                        'content': full_content
+                        'content': full_content,
+                        'content_lower': full_content.lower()
                     })
 
         doc.close()
         logging.info(f"Extracted {len(sections)} structured sections from {doc_name}.")
-        return sections
\ No newline at end of file
+        return sections
+
+
+# One processor per worker process, created on first use
+_worker_processor = None
+
+def extract_sections(pdf_path: str) -> list:
+    """
+    Module-level entry point for process pool workers. Workers only need to
+    import this module (and PyMuPDF), not the model code in main.py.
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = PDFProcessor()
+    return _worker_processor.extract_sections(pdf_path)
@@ -1,12 +1,17 @@
 import torch
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
+import hashlib
 import logging
+import os
 
 class SectionRanker:
     """
     Ranks text sections based on semantic similarity to a query.
     """
     MODEL_NAME = 'sentence-transformers/all-MiniLM-L12-v2'
+    ENCODE_BATCH_SIZE = 64
+    # The on-disk embedding cache is opt-in: set EMBEDDING_CACHE_PATH to enable it
+    CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', '')
 
     def __init__(self):
         """
@@ -14,15 +19,110 @@ class SectionRanker:
         """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logging.info(f"SectionRanker using device: {self.device}")
-        
+
         try:
             self.model = SentenceTransformer(self.MODEL_NAME, device=self.device)
+            if self.device == "cuda":
+                self.model = self.model.half()
+                # Prime the CUDA kernels so the first real batch is not charged for autotuning
+                with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16):
+                    self.model.encode("warmup", show_progress_bar=False)
             logging.info(f"Ranking model '{self.MODEL_NAME}' loaded successfully.")
         except Exception as e:
             logging.error(f"Failed to load sentence transformer model: {self.MODEL_NAME}")
             raise e
 
-    def rank_sections(self, query: str, sections: list) -> list:
+        # Embeddings are only comparable when produced by the same model in the same precision
+        self._cache_profile = {
+            'model': self.MODEL_NAME,
+            'device': self.device,
+            'dtype': 'float16' if self.device == "cuda" else 'float32'
+        }
+        self.embedding_cache = self._load_embedding_cache()
+        self._cache_dirty = False
+        self.query = None
+        self.query_embedding = None
+
+    def _load_embedding_cache(self) -> dict:
+        """Loads previously computed section embeddings, keyed by content hash."""
+        if not self.CACHE_PATH or not os.path.exists(self.CACHE_PATH):
+            return {}
+        try:
+            # The payload is plain tensors and strings, so nothing else needs unpickling
+            cache = torch.load(self.CACHE_PATH, map_location="cpu", weights_only=True)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable embedding cache {self.CACHE_PATH}: {e}")
+            return {}
+        if cache.get('profile') != self._cache_profile:
+            logging.info("Discarding embedding cache built with a different model, device or precision.")
+            return {}
+        logging.info(f"Loaded {len(cache['embeddings'])} cached section embeddings.")
+        return cache['embeddings']
+
+    def save_embedding_cache(self):
+        """Writes the embedding cache to disk so later runs can skip encoding."""
+        if not self.CACHE_PATH or not self._cache_dirty:
+            return
+        try:
+            cache_dir = os.path.dirname(self.CACHE_PATH)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            torch.save({'profile': self._cache_profile, 'embeddings': self.embedding_cache}, self.CACHE_PATH)
+            self._cache_dirty = False
+        except (IOError, OSError) as e:
+            logging.warning(f"Could not write embedding cache {self.CACHE_PATH}: {e}")
+
+    @staticmethod
+    def _content_key(content: str) -> str:
+        """Returns a short, stable hash of a section's content."""
+        return hashlib.blake2b(content.encode('utf-8')).hexdigest()[:16]
+
+    @torch.inference_mode()
+    def set_query(self, query: str):
+        """
+        Encodes the query once and caches its normalized embedding for
+        subsequent rank_sections calls.
+        """
+        with torch.autocast("cuda", dtype=torch.float16, enabled=self.device == "cuda"):
+            self.query_embedding = self.model.encode(
+                query, convert_to_tensor=True, device=self.device, normalize_embeddings=True
+            )
+        self.query = query
+
+    def _encode_contents(self, contents: list) -> torch.Tensor:
+        """Encodes section contents into normalized embeddings on the model's device."""
+        with torch.autocast("cuda", dtype=torch.float16, enabled=self.device == "cuda"):
+            # encode() already sorts inputs by length before batching (and restores the
+            # original order), so batches are padded tightly without sorting them here.
+            return self.model.encode(
+                contents,
+                batch_size=self.ENCODE_BATCH_SIZE,
+                convert_to_tensor=True,
+                device=self.device,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            )
+
+    def _cached_embeddings(self, contents: list) -> torch.Tensor:
+        """
+        Returns embeddings for the contents, encoding only those missing from the
+        embedding cache. Call save_embedding_cache() to persist new entries.
+        """
+        section_keys = [self._content_key(content) for content in contents]
+        contents_by_key = dict(zip(section_keys, contents))
+        missing_keys = [key for key in contents_by_key if key not in self.embedding_cache]
+
+        logging.info(f"Encoding {len(missing_keys)} of {len(contents)} sections for ranking...")
+        if missing_keys:
+            new_embeddings = self._encode_contents([contents_by_key[key] for key in missing_keys])
+            for key, embedding in zip(missing_keys, new_embeddings.float().cpu()):
+                self.embedding_cache[key] = embedding
+            self._cache_dirty = True
+
+        return torch.stack([self.embedding_cache[key] for key in section_keys]).to(self.query_embedding.device)
+
+    @torch.inference_mode()
+    def rank_sections(self, query: str, sections: list, top_k: int = None) -> list:
         """
         Ranks a list of text sections based on their semantic similarity to a query.
 
@@ -30,6 +130,8 @@ class SectionRanker:
             query (str): The search query (e.g., persona + job description).
             sections (list of dicts): A list of section dictionaries. Each dict
                                       must have a 'content' key.
+            top_k (int, optional): Only return the top_k most similar sections.
+                                   All sections are returned when omitted.
 
         Returns:
             list of dicts: The input list of sections, sorted by relevance,
@@ -40,19 +142,28 @@ class SectionRanker:
 
         section_contents = [sec.get('content', '') for sec in sections]
 
-        logging.info(f"Encoding query and {len(section_contents)} sections for ranking...")
-        query_embedding = self.model.encode(query, convert_to_tensor=True, device=self.device)
-        section_embeddings = self.model.encode(section_contents, convert_to_tensor=True, device=self.device)
-        
-        # Compute cosine similarity between the query and all sections
-        cosine_scores = util.cos_sim(query_embedding, section_embeddings)[0]
+        # The query embedding is only recomputed when the query changes
+        if query != self.query:
+            self.set_query(query)
+
+        if self.CACHE_PATH:
+            section_embeddings = self._cached_embeddings(section_contents)
+        else:
+            logging.info(f"Encoding {len(section_contents)} sections for ranking...")
+            section_embeddings = self._encode_contents(section_contents)
+
+        # Embeddings are unit length, so a single matrix-vector product gives the cosine similarity.
+        # Scoring in fp32 avoids fp16 rounding creating artificial ties between sections.
+        cosine_scores = torch.mv(section_embeddings.float(), self.query_embedding.float())
 
         # Add the calculated score to each section's dictionary
-        for i, section in enumerate(sections):
-            section['similarity_score'] = cosine_scores[i].item()
+        for section, score in zip(sections, cosine_scores.tolist()):
+            section['similarity_score'] = score
 
-        # Sort all sections by their similarity score in descending order
-        ranked_sections = sorted(sections, key=lambda x: x['similarity_score'], reverse=True)
+        # Select the best sections on the device instead of sorting the dicts in Python
+        k = len(sections) if top_k is None else min(top_k, len(sections))
+        top_indices = torch.topk(cosine_scores, k=k).indices.tolist()
+        ranked_sections = [sections[i] for i in top_indices]
         logging.info("Ranking complete.")
         
         return ranked_sections
@@ -1,3 +1,4 @@
+import heapq
 import re
 import logging
 
@@ -42,6 +43,16 @@ class RelevanceFilter:
         self.negative_keywords = self._extract_negative_keywords()
         self.distractor_titles = self._get_distractor_titles()
 
+        # One alternation per keyword set scans each text once instead of once per keyword.
+        # Positive matches are taken at every position (overlapping) so hits can be counted exactly.
+        self._pos_re = self._compile_keywords(self.positive_keywords, overlapping=True)
+        self._neg_re = self._compile_keywords(self.negative_keywords)
+        # For each positive keyword, every positive keyword it contains (itself included)
+        self._pos_contained = {
+            keyword: {other for other in self.positive_keywords if other in keyword}
+            for keyword in self.positive_keywords
+        }
+
         logging.info(f"RelevanceFilter initialized for domain: '{self.domain}'.")
         logging.info(f"Positive Keywords: {self.positive_keywords}")
         logging.info(f"Negative Keywords: {self.negative_keywords}")
@@ -88,17 +99,69 @@ class RelevanceFilter:
                 distractors.update(['breakfast', 'dinner'])
         return distractors
 
-    def filter_and_rerank(self, sections: list) -> list:
+    @staticmethod
+    def _compile_keywords(keywords: set, overlapping: bool = False):
+        """
+        Compiles a keyword set into a single pattern, or None if the set is empty.
+        With overlapping=True the pattern is a lookahead that reports the longest
+        keyword starting at every position of the text.
+        """
+        if not keywords:
+            return None
+        # Longest first, so a keyword is not shadowed by a shorter one it starts with
+        ordered = sorted(keywords, key=lambda k: (-len(k), k))
+        alternation = "|".join(re.escape(k) for k in ordered)
+        if overlapping:
+            return re.compile(f"(?=({alternation}))")
+        return re.compile(alternation)
+
+    def _count_keyword_hits(self, text_lower: str) -> int:
+        """
+        Counts the distinct positive keywords that occur anywhere in the text.
+
+        Any keyword occurring at a position is a prefix of the longest keyword matched
+        there, so the union of the keywords contained in each match is exactly the
+        set of keywords present.
+        """
+        if self._pos_re is None:
+            return 0
+        hits = set()
+        for keyword in set(self._pos_re.findall(text_lower)):
+            hits |= self._pos_contained[keyword]
+        return len(hits)
+
+    def relevant_paragraphs(self, section: dict) -> list:
+        """
+        Returns the paragraphs of a section (8+ words) that mention a positive keyword.
+        The split paragraphs and their lowercased copies are cached on the section.
+        """
+        if 'paragraphs' not in section:
+            content = section['content']
+            content_lower = section.get('content_lower') or content.lower()
+            # Lowercasing preserves line breaks, so both texts split into matching paragraphs
+            section['paragraphs'] = [
+                (para.strip(), para_lower.strip())
+                for para, para_lower in zip(re.split(r'\n{1,}', content), re.split(r'\n{1,}', content_lower))
+                if len(para.split()) >= 8
+            ]
+
+        if self._pos_re is None:
+            return []
+        return [para for para, para_lower in section['paragraphs'] if self._pos_re.search(para_lower)]
+
+    def filter_and_rerank(self, sections: list, top_k: int = None) -> list:
         """
         Applies hard filters and a nuanced scoring model to the list of sections.
+        When top_k is given, only the top_k highest scoring sections are returned.
         """
         filtered_sections = []
         for section in sections:
-            content_lower = section['content'].lower()
-            doc_name_lower = section['document'].lower()
+            # Use the lowercased copies precomputed at extraction time when present
+            content_lower = section.get('content_lower') or section['content'].lower()
+            doc_name_lower = section.get('document_lower') or section['document'].lower()
 
             # --- Hard Filter: Check for absolute negative keywords ---
-            if any(neg_keyword in content_lower for neg_keyword in self.negative_keywords):
+            if self._neg_re is not None and self._neg_re.search(content_lower):
                 logging.warning(f"FILTERED (contains negative keyword): Page {section['page_num']} from {section['document']}")
                 continue
 
@@ -111,7 +174,7 @@ class RelevanceFilter:
                 logging.info(f"PENALIZED (distracting title): Page {section['page_num']} from {section['document']}")
 
             # 2. Boost sections that contain the most important positive keywords
-            keyword_hits = sum(1 for keyword in self.positive_keywords if keyword in content_lower)
+            keyword_hits = self._count_keyword_hits(content_lower)
             
             # Apply a boost proportional to the number of keyword hits
             if keyword_hits > 0:
@@ -122,5 +185,7 @@ class RelevanceFilter:
             filtered_sections.append(section)
 
         # Sort by the new final score
+        if top_k is not None:
+            return heapq.nlargest(top_k, filtered_sections, key=lambda x: x.get('final_score', 0))
         reranked_sections = sorted(filtered_sections, key=lambda x: x.get('final_score', 0), reverse=True)
         return reranked_sections
@@ -0,0 +1,57 @@
+import os
+import logging
+import torch
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may run on. Unlike os.cpu_count(),
+    this respects CPU affinity and container cpusets where the platform exposes them.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity is not available on macOS or Windows
+        return os.cpu_count() or 1
+
+def split_cpus() -> tuple:
+    """
+    Splits the available CPUs between the PDF extraction worker pool and PyTorch's
+    intra-op threads. The two run at the same time while sections are streamed
+    into the encoder, so giving each all cores would oversubscribe the CPU.
+
+    Returns:
+        tuple: (extraction_workers, torch_threads), each at least 1.
+    """
+    cpus = available_cpus()
+    extraction_workers = max(1, cpus // 2)
+    torch_threads = max(1, cpus - extraction_workers)
+    return extraction_workers, torch_threads
+
+def restore_torch_threads():
+    """
+    Gives PyTorch every available CPU again once the extraction pool has shut
+    down, so later encoding and generation are not limited to the split share.
+    """
+    num_threads = available_cpus()
+    torch.set_num_threads(num_threads)
+    logging.info(f"PyTorch intra-op threads restored to {num_threads}.")
+
+def configure_runtime(num_threads: int):
+    """
+    Tunes PyTorch threading and CUDA kernel selection for inference.
+    Must be called once, before any model is loaded.
+
+    Args:
+        num_threads (int): Number of intra-op threads PyTorch may use.
+    """
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        # The inter-op pool can only be sized before it is first used
+        logging.warning("PyTorch inter-op threads already started; keeping the existing pool size.")
+
+    if torch.cuda.is_available():
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+
+    logging.info(f"PyTorch runtime configured with {num_threads} intra-op threads.")
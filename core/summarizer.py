@@ -1,67 +1,62 @@
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-import torch
 import logging
 
+from core.t5_service import T5Service
+
 class TextSummarizer:
     """
-    Summarizes text using the T5-small model, guided by the user's original query
+    Summarizes text using the FLAN-T5-small model, guided by the user's original query
     to ensure the summary is relevant and detailed.
     """
-    MODEL_NAME = 't5-small'
-
     def __init__(self):
         """
-        Initializes the tokenizer and model for summarization.
+        Attaches to the shared T5 service; the model is loaded on first use.
         """
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logging.info(f"TextSummarizer using device: {self.device}")
-        try:
-            # Using legacy=False is recommended for new T5 usage
-            self.tokenizer = T5Tokenizer.from_pretrained(self.MODEL_NAME, legacy=False)
-            self.model = T5ForConditionalGeneration.from_pretrained(self.MODEL_NAME).to(self.device)
-            logging.info(f"Summarization model '{self.MODEL_NAME}' loaded successfully.")
-        except Exception as e:
-            logging.error(f"Failed to load T5 model or tokenizer: {self.MODEL_NAME}")
-            raise e
+        self.service = T5Service.get()
+        logging.info(f"TextSummarizer using shared T5 model '{self.service.MODEL_NAME}'.")
 
-    def summarize(self, query: str, text: str) -> str:
+    def summarize(self, query: str, text: str, num_beams: int = 1) -> str:
         """
         Generates a concise, relevant summary for the given text, guided by the query.
 
         Args:
             query (str): The user's original request (e.g., "vegetarian dinner").
             text (str): The text content from a relevant page to summarize.
+            num_beams (int): Beam width; 1 decodes greedily, 2 when quality matters.
 
         Returns:
             str: The generated summary.
         """
-        if not text:
-            return ""
+        return self.summarize_batch([query], [text], num_beams=num_beams)[0]
+
+    def summarize_batch(self, queries: list, texts: list, num_beams: int = 1, batch_size: int = 16) -> list:
+        """
+        Generates summaries for many texts in padded batches.
+
+        Args:
+            queries (list of str): The user's original request for each text.
+            texts (list of str): The text contents to summarize.
+            num_beams (int): Beam width; 1 decodes greedily, 2 when quality matters.
+            batch_size (int): Number of prompts decoded together.
 
+        Returns:
+            list of str: The generated summary for each input text, in input order.
+        """
         # A more instructional prompt for better, context-aware summaries.
-        prompt = (
-            f"Based on the user's request for '{query}', provide a detailed summary of the "
-            f"following text. Focus on the key ingredients, preparation steps, and any "
-            f"details relevant to the request. Text to summarize: {text}"
-        )
-        
-        inputs = self.tokenizer.encode(
-            prompt,
-            return_tensors='pt',
-            max_length=1024, # Use a larger context window
-            truncation=True
-        ).to(self.device)
+        prompts = [
+            (
+                f"Based on the user's request for '{query}', provide a detailed summary of the "
+                f"following text. Focus on the key ingredients, preparation steps, and any "
+                f"details relevant to the request. Text to summarize: {text}"
+            ) if text else ""
+            for query, text in zip(queries, texts)
+        ]
 
         # Generate a longer, more descriptive summary
-        summary_ids = self.model.generate(
-            inputs,
-            max_length=200,   # Target a longer summary
-            min_length=70,    # Ensure it's not too brief
+        return self.service.generate(
+            prompts,
+            max_length=200,     # Target a longer summary
+            min_length=70,      # Ensure it's not too brief
             length_penalty=2.5, # Encourage detail
-            num_beams=4,
-            early_stopping=True
+            num_beams=num_beams,
+            batch_size=batch_size
         )
-
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        
-        return summary
\ No newline at end of file
@@ -1,18 +1,27 @@
 import os
-import json
 import glob
+import heapq
 import logging
-import re
+import orjson
 from datetime import datetime
 from pytz import timezone as pytz_timezone
 from tqdm import tqdm
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Import core processing modules from the 'core' directory
-from core.pdf_processor import PDFProcessor
-from core.ranking import SectionRanker
+# Import core processing modules from the 'core' directory. The torch-based modules
+# (ranking, runtime) are imported inside main() so that extraction worker processes,
+# which re-import this file on spawn platforms such as macOS, stay lightweight.
+from core.pdf_processor import extract_sections
 from core.relevance_filter import RelevanceFilter
 
+# Number of globally ranked sections used for the subsection analysis
+TOP_K_SECTIONS = 10
+# Number of sections (each with a distinct title) reported in extracted_sections
+TOP_UNIQUE_TITLES = 5
+# Number of extracted sections embedded together while documents are still being parsed
+SECTION_BATCH_SIZE = 64
+
 # --- Setup robust logging ---
 logging.basicConfig(
     level=logging.INFO,
@@ -42,8 +51,8 @@ def main():
     logging.info(f"Loading configuration from: {input_path}")
     
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        with open(input_path, 'rb') as f:
+            config = orjson.loads(f.read())
         persona = config['persona']['role']
         job_to_be_done = config['job_to_be_done']['task']
     except Exception as e:
@@ -52,10 +61,15 @@ def main():
 
     logging.info("Initializing core components...")
     try:
-        pdf_processor = PDFProcessor()
+        from core.ranking import SectionRanker
+        from core.runtime import configure_runtime, restore_torch_threads, split_cpus
+
+        extraction_workers, torch_threads = split_cpus()
+        configure_runtime(torch_threads)
         ranker = SectionRanker()
         query = f"Persona: {persona}. Task: {job_to_be_done}"
         relevance_filter = RelevanceFilter(query)
+        ranker.set_query(query)
     except Exception as e:
         logging.error(f"FATAL: Failed to initialize models. Error: {e}")
         return
@@ -65,64 +79,80 @@ def main():
         logging.warning("No PDF files found in the input directory.")
         return
 
-    # --- MAJOR CHANGE HERE: Initialize lists to hold all results ---
-    all_sections_list = []
     all_subsections_list = []
 
+    # --- Extract, rank and filter sections as a stream ---
+    # Worker processes keep parsing PDFs while this process embeds the sections that
+    # have already arrived, so the encoder starts before all parsing is done. Only the
+    # current best TOP_K_SECTIONS and the best section of each title are held in memory.
     logging.info(f"Found {len(pdf_files)} PDF(s) to process.")
-    for pdf_path in tqdm(pdf_files, desc="Processing all documents"):
-        # 1. Extract sections from the current PDF
-        sections = pdf_processor.extract_sections(pdf_path)
-        if not sections:
-            continue
-        
-        # 2. Rank and filter sections for this PDF
+    top_sections_heap = []  # min-heap of (final_score, -pdf_index, -section_index, section)
+    # The first occurrence of a title in the global ranking is its best entry, so the
+    # top unique titles are exactly the titles with the highest best entries.
+    best_entry_by_title = {}
+    pending = []
+
+    def rank_pending():
+        sections = [section for _, _, section in pending]
+        positions = {id(section): (pdf_index, section_index) for pdf_index, section_index, section in pending}
         semantically_ranked = ranker.rank_sections(query, sections)
-        final_ranked = relevance_filter.filter_and_rerank(semantically_ranked)
-        
-        # 3. Add all processed sections to the master list to be ranked globally later
-        all_sections_list.extend(final_ranked)
+        for section in relevance_filter.filter_and_rerank(semantically_ranked):
+            pdf_index, section_index = positions[id(section)]
+            # Earlier input positions win ties, so results do not depend on completion order
+            entry = (section['final_score'], -pdf_index, -section_index, section)
+            best_entry = best_entry_by_title.get(section['title'])
+            if best_entry is None or entry[:3] > best_entry[:3]:
+                best_entry_by_title[section['title']] = entry
+            if len(top_sections_heap) < TOP_K_SECTIONS:
+                heapq.heappush(top_sections_heap, entry)
+            else:
+                heapq.heappushpop(top_sections_heap, entry)
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=min(extraction_workers, len(pdf_files))) as executor:
+        futures = {executor.submit(extract_sections, pdf_path): pdf_index
+                   for pdf_index, pdf_path in enumerate(pdf_files)}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing all documents"):
+            pdf_index = futures[future]
+            pending.extend((pdf_index, section_index, section)
+                           for section_index, section in enumerate(future.result()))
+            if len(pending) >= SECTION_BATCH_SIZE:
+                rank_pending()
+    # The pool has shut down, so the remaining work can use every core
+    restore_torch_threads()
+    if pending:
+        rank_pending()
+    ranker.save_embedding_cache()
+
+    globally_ranked_sections = [entry[-1] for entry in sorted(top_sections_heap, reverse=True)]
 
-    # --- NEW LOGIC: Process all collected results together ---
-    if not all_sections_list:
+    if not globally_ranked_sections:
         logging.error("No relevant sections found across all documents. No output file will be generated.")
         return
 
-    # 1. Sort the master list of all sections from all documents by their final score
-    globally_ranked_sections = sorted(all_sections_list, key=lambda x: x.get('final_score', 0), reverse=True)
-
-    # 2. Prepare the final top 5 sections for output
+    # 1. Prepare the final top 5 sections (one per title) for output
     final_extracted_sections = []
-    seen_titles = set()
-    for section in globally_ranked_sections:
-        if len(final_extracted_sections) >= 5:
-            break
-        if section['title'] not in seen_titles:
-            final_extracted_sections.append({
-                "document": section['document'],
-                "section_title": section['title'],
-                "page_number": section['page_num']
-            })
-            seen_titles.add(section['title'])
+    for entry in heapq.nlargest(TOP_UNIQUE_TITLES, best_entry_by_title.values(), key=lambda e: e[:3]):
+        section = entry[-1]
+        final_extracted_sections.append({
+            "document": section['document'],
+            "section_title": section['title'],
+            "page_number": section['page_num']
+        })
 
-    # 3. Assign the final importance rank
+    # 2. Assign the final importance rank
     for i, sec in enumerate(final_extracted_sections):
         sec["importance_rank"] = i + 1
 
-    # 4. Create the subsection analysis from the globally ranked sections
+    # 3. Create the subsection analysis from the globally ranked sections
     # We will check the top 10 globally ranked sections for relevant paragraphs
     for section in globally_ranked_sections[:10]:
-        paragraphs = re.split(r'\n{1,}', section['content'])
-        for para in paragraphs:
-            para = para.strip()
-            if len(para.split()) < 8:
-                continue
-            if any(kw in para.lower() for kw in relevance_filter.positive_keywords):
-                all_subsections_list.append({
-                    "document": section['document'],
-                    "refined_text": para,
-                    "page_number": section['page_num']
-                })
+        for para in relevance_filter.relevant_paragraphs(section):
+            all_subsections_list.append({
+                "document": section['document'],
+                "refined_text": para,
+                "page_number": section['page_num']
+            })
     
     # --- ASSEMBLE AND WRITE THE SINGLE FINAL JSON ---
     final_output_data = {
@@ -130,7 +160,7 @@ def main():
             "input_documents": [os.path.basename(p) for p in pdf_files],
             "persona": persona,
             "job_to_be_done": job_to_be_done,
-            "processing_timestamp": datetime.now(pytz_timezone('UTC')).isoformat()
+            "processing_timestamp": datetime.now(pytz_timezone('UTC'))  # orjson writes ISO 8601
         },
         "extracted_sections": final_extracted_sections,
         "subsection_analysis": all_subsections_list
@@ -138,8 +168,8 @@ def main():
 
     output_path = os.path.join(output_dir, "output.json")
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(final_output_data, f, ensure_ascii=False, indent=4)
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(final_output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         logging.info(f"Successfully generated consolidated output at {output_path}")
     except IOError as e:
         logging.error(f"Could not write final output file {output_path}. Error: {e}")